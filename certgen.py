@@ -0,0 +1,444 @@
+# ======================================
+# certgen.py — certificate rendering (importable, so pool workers can load it)
+# ======================================
+
+from pathlib import Path
+from PIL import Image, ImageDraw, ImageFont
+import unicodedata, re, zipfile, io, os, multiprocessing, threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+# Optional SIMD resampler; Pillow's own resize is used when it isn't installed
+try:
+    from pic_scale import resize as _simd_resize, Resampling as _SimdResampling
+except ImportError:
+    _simd_resize = None
+
+# ------------------------------
+# Utility functions
+# ------------------------------
+_FILENAME_BAD = re.compile(r"[^\w\s\-_.]")
+_FILENAME_WS = re.compile(r"\s+")
+# ASCII characters _FILENAME_BAD would strip, for a str.translate fast path
+_FILENAME_ASCII_DROP = str.maketrans("", "", "".join(c for c in map(chr, range(128)) if _FILENAME_BAD.match(c)))
+
+@lru_cache(maxsize=4096)
+def sanitize_filename(s):
+    # Cached: webinar and date repeat on every row of a batch
+    s = unicodedata.normalize("NFKD", str(s))
+    s = s.translate(_FILENAME_ASCII_DROP) if s.isascii() else _FILENAME_BAD.sub("", s)
+    s = _FILENAME_WS.sub("_", s.strip())
+    return s[:200] or "unknown"
+
+def text_dimensions(draw, text, font):
+    font = _layout_font(font, text)
+    try:
+        bbox = draw.textbbox((0, 0), text, font=font)
+        return bbox[2] - bbox[0], bbox[3] - bbox[1]
+    except Exception:
+        return draw.textsize(text, font=font)
+
+def _text_width(draw, text, font):
+    # Layout-only advance width; cheaper than a full textbbox when height isn't needed.
+    # textlength rejects multiline text (and is missing on old Pillow), so
+    # fall back to the bbox width there
+    font = _layout_font(font, text)
+    try:
+        return draw.textlength(text, font=font)
+    except (AttributeError, ValueError):
+        return text_dimensions(draw, text, font)[0]
+
+@lru_cache(maxsize=512)
+def _load_font(path_str, size):
+    try:
+        if path_str and Path(path_str).exists():
+            return ImageFont.truetype(path_str, size)
+    except Exception:
+        pass
+    return ImageFont.load_default()
+
+def get_font_file(path, size):
+    # Fonts are cached per (path, size) so repeated rows don't re-parse the TTF
+    return _load_font(str(path) if path else "", size)
+
+@lru_cache(maxsize=512)
+def _basic_layout_variant(font):
+    return font.font_variant(layout_engine=ImageFont.Layout.BASIC)
+
+def _layout_font(font, text):
+    """
+    Plain ASCII needs no complex shaping (BiDi, ligatures), so measure and
+    render it with the basic layout engine. Other scripts keep Raqm.
+    """
+    if text.isascii() and getattr(font, "layout_engine", None) == ImageFont.Layout.RAQM:
+        return _basic_layout_variant(font)
+    return font
+
+# Shared draw for text measurement. Rows are RGB, so its metrics match
+# what gets rendered onto them.
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+# Measurements cached per (text, font): words, names, webinar titles and
+# paragraph lines repeat across rows. Fonts are cached singletons, so the
+# font object itself is a stable key.
+@lru_cache(maxsize=8192)
+def _measure_width(text, font):
+    return _text_width(_MEASURE_DRAW, text, font)
+
+@lru_cache(maxsize=8192)
+def _measure(text, font):
+    return text_dimensions(_MEASURE_DRAW, text, font)
+
+def wrap_text(text, font, max_width):
+    # Greedy wrap on cached per-word widths; words repeat across every row
+    space_w = _measure_width(" ", font)
+    lines, cur, cur_w = [], [], 0
+    for w in text.split():
+        ww = _measure_width(w, font)
+        test_w = cur_w + space_w + ww if cur else ww
+        if test_w <= max_width:
+            cur.append(w)
+            cur_w = test_w
+        else:
+            if cur:
+                lines.append(" ".join(cur))
+            cur, cur_w = [w], ww
+    if cur:
+        lines.append(" ".join(cur))
+    return lines
+
+@lru_cache(maxsize=64)
+def _paragraph_parts(template_paragraph, webinar, date_str):
+    # Everything but the name is fixed per (webinar, date) group: format it
+    # once with a NUL placeholder and split there, so rows only splice the name
+    return tuple(template_paragraph.format(NAME="\0", WEBINAR=webinar, DATE=date_str, PRONOUN="their").split("\0"))
+
+@lru_cache(maxsize=512)
+def create_paragraph_lines(name, webinar, date_str, font, max_width, template_paragraph):
+    text = name.join(_paragraph_parts(template_paragraph, webinar, date_str))
+    return tuple(wrap_text(text, font, max_width))
+
+# ------------------------------
+# Certificate generation
+# ------------------------------
+@lru_cache(maxsize=4)
+def _decode_template(template_bytes):
+    # Decoded once per worker process; rows draw on a copy
+    base = Image.open(io.BytesIO(template_bytes))
+    if base.format == "JPEG":
+        # Let libjpeg decode straight to RGB at full size
+        base.draft("RGB", base.size)
+    base = base.convert("RGB")
+    base.load()
+    return base
+
+@lru_cache(maxsize=4)
+def _prepare_signature(signature_bytes, W, H):
+    """
+    Decode and downscale the signature once per worker.
+    Returns (sig, alpha_mask, (x, y)) or None if the image can't be used.
+    """
+    try:
+        sig = Image.open(io.BytesIO(signature_bytes)).convert("RGBA")
+        max_sig_w = int(W * 0.18)
+        if sig.width > max_sig_w:
+            new_size = (max_sig_w, int(sig.height * max_sig_w / sig.width))
+            if _simd_resize is not None:
+                sig = _simd_resize(sig, new_size, _SimdResampling.LANCZOS)
+            else:
+                sig = sig.resize(new_size, Image.Resampling.LANCZOS)
+        sig.load()
+    except Exception:
+        return None
+    margin = int(W * 0.05)
+    return sig, sig.getchannel("A"), (W - sig.width - margin, H - sig.height - margin)
+
+@lru_cache(maxsize=1024)
+def _text_mask(text, font):
+    # Rendered coverage mask + offset; repeated strings are rasterized once
+    if isinstance(font, ImageFont.FreeTypeFont):
+        return font.getmask2(text, mode="L")
+    return font.getmask(text, mode="L"), (0, 0)
+
+@lru_cache(maxsize=8192)
+def _glyph(font, ch):
+    # (mask, x offset, y offset, advance) for one character
+    mask, (ox, oy) = font.getmask2(ch, mode="L")
+    return mask, ox, oy, font.getlength(ch)
+
+@lru_cache(maxsize=16384)
+def _kerning(font, prev, ch):
+    return font.getlength(prev + ch) - font.getlength(prev) - font.getlength(ch)
+
+def _draw_text(img, xy, text, font, fill):
+    """
+    Same result as ImageDraw.text for an opaque fill, but pastes cached
+    masks straight into the image core instead of re-laying out text.
+    Returns the (left, top, right, bottom) box that was painted.
+
+    Basic-layout fonts go through a per-character glyph atlas, so FreeType
+    only rasterizes each (font, char) once per worker; overlapping glyph
+    edges can differ from a whole-string render by one level on a pixel or
+    two. Shaped (Raqm) or bitmap fonts paste one cached whole-string mask.
+    Multiline text (a cell with a line break) is left to ImageDraw, which
+    lays it out line by line.
+    """
+    font = _layout_font(font, text)
+    x0, y0 = int(xy[0]), int(xy[1])
+    if "\n" in text:
+        draw = ImageDraw.Draw(img)
+        draw.multiline_text((x0, y0), text, font=font, fill=fill)
+        return draw.multiline_textbbox((x0, y0), text, font=font)
+    if getattr(font, "layout_engine", None) != ImageFont.Layout.BASIC:
+        mask, (ox, oy) = _text_mask(text, font)
+        box = (x0 + ox, y0 + oy, x0 + ox + mask.size[0], y0 + oy + mask.size[1])
+        img.im.paste(fill, box, mask)
+        return box
+
+    boxes = []
+    pen, prev = x0, None
+    for ch in text:
+        if prev is not None:
+            pen += _kerning(font, prev, ch)
+        mask, ox, oy, advance = _glyph(font, ch)
+        if mask.size[0] and mask.size[1]:
+            gx, gy = int(round(pen)) + ox, y0 + oy
+            box = (gx, gy, gx + mask.size[0], gy + mask.size[1])
+            img.im.paste(fill, box, mask)
+            boxes.append(box)
+        pen += advance
+        prev = ch
+    if not boxes:
+        return (x0, y0, x0, y0)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+# Each entry is a full-frame RGB image per worker; a miss only costs one re-render
+@lru_cache(maxsize=4)
+def _group_background(template_bytes, signature_bytes, webinar, date, webinar_font, date_font, layout):
+    """
+    Template with everything shared by a (webinar, date) group already drawn:
+    webinar title, date line and signature. Rows copy it and only add the
+    name and paragraph.
+    """
+    img = _decode_template(template_bytes).copy()
+    W, H = img.size
+    right_margin, webinar_y, date_x, date_y = layout
+
+    # Webinar (top-right)
+    wb_w, _ = _measure(webinar, webinar_font)
+    _draw_text(img, (W - wb_w - right_margin, webinar_y), webinar, webinar_font, (30,30,30))
+
+    # Date
+    _draw_text(img, (date_x, date_y), f"Date : {date}", date_font, (60,60,60))
+
+    # Signature (optional)
+    prepared = _prepare_signature(signature_bytes, W, H) if signature_bytes else None
+    if prepared:
+        sig, mask, pos = prepared
+        img.paste(sig, pos, mask)
+    return img
+
+@lru_cache(maxsize=4)
+def _scratch_canvas(mode, size):
+    # One reusable row buffer per worker instead of a fresh allocation per row
+    return Image.new(mode, size)
+
+# What the scratch canvas currently shows: its background and the area the
+# last row drew over it
+_canvas_state = {}
+
+def _reset_canvas(background):
+    """
+    Return the worker's scratch canvas showing `background`. When the
+    background is the same as for the previous row, only the area that row
+    drew on is restored instead of copying the whole frame.
+    """
+    img = _scratch_canvas(background.mode, background.size)
+    if _canvas_state.get("background") is background:
+        box = _canvas_state.get("dirty")
+        if box:
+            img.paste(background.crop(box), box[:2])
+    else:
+        img.paste(background)
+    _canvas_state["background"] = background
+    # Whole frame until the row finishes and _mark_dirty narrows it, so a
+    # row that fails mid-draw can't leave its text for the next one
+    _canvas_state["dirty"] = (0, 0) + img.size
+    return img
+
+def _mark_dirty(img, boxes):
+    # Union of the painted boxes, clipped to the canvas
+    W, H = img.size
+    l, t, r, b = (min(bx[0] for bx in boxes), min(bx[1] for bx in boxes),
+                  max(bx[2] for bx in boxes), max(bx[3] for bx in boxes))
+    box = (max(l, 0), max(t, 0), min(r, W), min(b, H))
+    _canvas_state["dirty"] = box if box[0] < box[2] and box[1] < box[3] else None
+
+# Inputs shared by every task, set once per worker process
+_worker_assets = {}
+
+def _init_worker(template_bytes, signature_bytes, fonts, config):
+    _worker_assets.update(
+        template=template_bytes,
+        signature=signature_bytes,
+        fonts=fonts,
+        config=config,
+        # fonts whose size doesn't depend on the row are resolved once
+        webinar_font=get_font_file(fonts.get("webinar"), config["webinar_font_size"]),
+        date_font=get_font_file(fonts.get("date"), config["date_font_size"]),
+        para_font=get_font_file(fonts.get("para"), config["para_font_size"]),
+    )
+
+def _render_one(row):
+    """
+    Render a single (name, webinar, date) certificate.
+    Returns (file name, encoded image bytes).
+    Top-level so it can be pickled into ProcessPoolExecutor workers.
+    """
+    name, webinar, date = row
+    assets = _worker_assets
+    fonts, config = assets["fonts"], assets["config"]
+
+    background = _group_background(
+        assets["template"], assets["signature"], webinar, date,
+        assets["webinar_font"], assets["date_font"],
+        (config["webinar_right_margin"], config["webinar_y"], config["date_x"], config["date_y"]),
+    )
+    img = _reset_canvas(background)
+    W, H = img.size
+
+    # Name (center)
+    horiz_max_width = W - config["name_max_width_adjust"]
+    if config.get("name_force_size"):
+        chosen_font = get_font_file(fonts.get("name"), config["name_force_size"])
+    else:
+        # Width scales ~linearly with size: estimate from one measurement at
+        # the max size, then step to the exact largest size that fits
+        # (falls back to the min size when nothing fits)
+        lo, hi = config["name_min_size"], config["name_max_size"]
+
+        def fits(size):
+            return _measure_width(name, get_font_file(fonts.get("name"), size)) <= horiz_max_width
+
+        if lo > hi:
+            # empty min..max range: the min size is used, as with a plain scan
+            size = lo
+        else:
+            w_ref = _measure_width(name, get_font_file(fonts.get("name"), hi))
+            if w_ref <= horiz_max_width:
+                size = hi
+            elif w_ref <= 0:
+                # zero-width (blank) name that still doesn't fit: no width
+                # to scale from, and no size will fit
+                size = lo
+            else:
+                size = max(lo, min(hi - 1, int(hi * horiz_max_width / w_ref)))
+                while size > lo and not fits(size):
+                    size -= 1
+                while size < hi - 1 and fits(size + 1):
+                    size += 1
+        chosen_font = get_font_file(fonts.get("name"), size)
+
+    name_w, name_h = _measure(name, chosen_font)
+    name_x = ((W - name_w) // 2) + config["name_x_adjust"]
+    painted = [_draw_text(img, (name_x, config["name_y"]), name, chosen_font, (212,160,23))]
+
+    # Paragraph text
+    para_font = assets["para_font"]
+    lines = create_paragraph_lines(name, webinar, date, para_font,
+                                   config["para_wrap_width"], config["paragraph_template"])
+    start_y = config["name_y"] + name_h + config["para_top_offset"]
+    for ln in lines:
+        lw, lh = _measure(ln, para_font)
+        painted.append(_draw_text(img, ((W - lw)//2 + config["para_x_adjust"], start_y), ln, para_font, (60,60,60)))
+        start_y += lh + config["para_line_spacing"]
+    _mark_dirty(img, painted)
+
+    # Save image
+    fmt = config['output_format'].upper()
+    fname = f"{sanitize_filename(webinar)}_{sanitize_filename(date)}_{sanitize_filename(name)}.{fmt.lower()}"
+    # Favour encode speed: single-pass baseline JPEG with 4:2:0 chroma, and
+    # fast zlib for PNG (flat certificate art still compresses well at 1)
+    if fmt == "JPEG":
+        save_opts = {"quality": config.get("jpg_quality", 95), "optimize": False, "progressive": False, "subsampling": 2}
+    else:
+        save_opts = {"compress_level": 1, "optimize": False}
+    buf = io.BytesIO()
+    img.save(buf, fmt, **save_opts)
+    return fname, buf.getvalue()
+
+def _render_row_safe(row):
+    # One bad row is reported instead of failing the whole pool
+    try:
+        return _render_one(row)
+    except Exception as e:
+        return None, f"{row[0] or '(blank name)'}: {e}"
+
+# Serializes in-process rendering across Streamlit session threads
+_fallback_lock = threading.Lock()
+
+def _render_rows(rows, initargs):
+    """
+    Yield (file name, bytes) for each row, in order, or (None, error
+    message) for a row that failed to render. Rows are independent,
+    so they're rendered across a process pool; if the pool can't start or
+    its workers die, the remaining rows are rendered here in-process.
+    """
+    # Template/signature bytes, fonts and config go to each worker once via
+    # the initializer; tasks only carry the row tuple.
+    # Never start more workers than there are rows to render
+    workers = max(1, min(os.cpu_count() or 1, len(rows)))
+    # Never fork Streamlit's multithreaded server process directly: use a
+    # forkserver (workers fork from a clean single-threaded server) where
+    # the platform has one, spawn elsewhere
+    methods = multiprocessing.get_all_start_methods()
+    mp_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=initargs) as ex:
+            for result in ex.map(_render_row_safe, rows, chunksize=max(1, len(rows) // (4 * workers))):
+                done += 1
+                yield result
+        return
+    except (BrokenProcessPool, OSError, NotImplementedError):
+        pass
+    # The fallback uses this process's worker globals (_worker_assets, the
+    # scratch canvas), which every Streamlit session thread shares
+    with _fallback_lock:
+        _init_worker(*initargs)
+        for row in rows[done:]:
+            yield _render_row_safe(row)
+
+def generate_certificates_from_inputs(rows, template_path, fonts, signature_path, config, preview_count=3, on_progress=None):
+    """
+    rows: list of (name, webinar, date) string tuples.
+    Calls on_progress(done, total) as each row is processed.
+    Returns (file names, zip bytes, encoded bytes of the first preview_count
+    certificates, error messages for rows that failed). Nothing is written
+    to disk.
+    """
+    template_bytes = Path(template_path).read_bytes()
+    signature_bytes = None
+    if signature_path and Path(signature_path).exists():
+        signature_bytes = Path(signature_path).read_bytes()
+
+    # Stream each encoded image into an in-memory zip as it arrives.
+    # PNG/JPEG are already compressed, so store rather than deflate.
+    created, previews, failed = [], [], []
+    zip_buf = io.BytesIO()
+    with zipfile.ZipFile(zip_buf, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+        results = _render_rows(rows, (template_bytes, signature_bytes, fonts, config))
+        for done, (fname, data) in enumerate(results, 1):
+            if fname is None:
+                failed.append(data)
+            else:
+                zf.writestr(fname, data)
+                created.append(fname)
+                if len(previews) < preview_count:
+                    previews.append(data)
+            if on_progress:
+                on_progress(done, len(rows))
+    return created, zip_buf.getvalue(), previews, failed